@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+NUSA Compute - Heartbeat Gateway
+An optional aggregation service for the NUSA Compute provider fleet.
+
+Provider clients POST their heartbeats here (set HEARTBEAT_GATEWAY_URL on
+each node); the gateway buffers rows briefly and flushes them to Supabase
+as a single bulk upsert. With N nodes this turns N writes per interval
+into one, cutting connection churn and per-row transactional overhead.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Third-party imports
+try:
+    from supabase import create_client, Client
+except ImportError as e:
+    print(f"[ERROR] Missing dependency: {e}")
+    print("Please run: pip install -r requirements.txt")
+    sys.exit(1)
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+FLUSH_INTERVAL = 5  # seconds; how long heartbeats accumulate before a flush
+TABLE_NAME = "nodes"
+DEFAULT_PORT = 8787
+
+
+# =============================================================================
+# Logging Setup
+# =============================================================================
+
+def setup_logging() -> logging.Logger:
+    """Configure and return the application logger."""
+    logger = logging.getLogger("NUSA-GW")
+    logger.setLevel(logging.INFO)
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setLevel(logging.INFO)
+    formatter = logging.Formatter("[%(name)s] %(message)s")
+    handler.setFormatter(formatter)
+
+    # Avoid duplicate handlers on reload
+    if not logger.handlers:
+        logger.addHandler(handler)
+
+    return logger
+
+
+logger = setup_logging()
+
+
+# =============================================================================
+# Heartbeat Buffer
+# =============================================================================
+
+# Latest heartbeat per node; a newer row from the same node replaces the
+# older one, so a flush never writes stale data
+_buffer: dict[str, dict] = {}
+_buffer_lock = threading.Lock()
+
+
+def enqueue_heartbeat(row: dict) -> None:
+    """Store a heartbeat row for the next bulk flush (latest wins per node)."""
+    with _buffer_lock:
+        _buffer[row["node_id"]] = row
+
+
+def drain_buffer() -> list[dict]:
+    """Take all buffered rows, leaving the buffer empty."""
+    with _buffer_lock:
+        rows = list(_buffer.values())
+        _buffer.clear()
+    return rows
+
+
+def run_flush_loop(client: Client) -> None:
+    """Periodically upsert all buffered heartbeats in one bulk call."""
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+
+        rows = drain_buffer()
+        if not rows:
+            continue
+
+        try:
+            client.table(TABLE_NAME).upsert(rows, on_conflict="node_id").execute()
+            logger.info(f"Flushed {len(rows)} heartbeat(s) in one upsert.")
+        except Exception as e:
+            logger.error(f"Bulk upsert failed, rows will retry next heartbeat: {e}")
+
+
+# =============================================================================
+# HTTP Server
+# =============================================================================
+
+class HeartbeatHandler(BaseHTTPRequestHandler):
+    """Accepts heartbeat POSTs from provider clients."""
+
+    def do_POST(self) -> None:
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            row = json.loads(self.rfile.read(length))
+        except (ValueError, json.JSONDecodeError):
+            self.send_error(400, "Invalid JSON payload")
+            return
+
+        # Valid JSON isn't necessarily a heartbeat: a bare number or
+        # string would crash the buffer, so reject anything that isn't
+        # an object keyed by a string node_id
+        if not isinstance(row, dict):
+            self.send_error(400, "Payload must be a JSON object")
+            return
+        if not isinstance(row.get("node_id"), str):
+            self.send_error(400, "Missing or invalid node_id")
+            return
+
+        enqueue_heartbeat(row)
+        self.send_response(202)
+        self.end_headers()
+
+    def log_message(self, format: str, *args) -> None:
+        # Per-request access logs would drown out the flush logs
+        pass
+
+
+# =============================================================================
+# Main Entry Point
+# =============================================================================
+
+def _load_env(filename: str = ".env") -> None:
+    """Read KEY=VALUE pairs from a .env file into os.environ (env wins)."""
+    env_file = Path(__file__).parent / filename
+    try:
+        lines = env_file.read_text().splitlines()
+    except OSError:
+        return
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        os.environ.setdefault(key.strip(), value.strip().strip("'\""))
+
+
+def init_supabase() -> Client | None:
+    """Initialize the Supabase client using environment variables."""
+    _load_env()
+
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+
+    if not url or not key:
+        logger.error("Missing SUPABASE_URL or SUPABASE_KEY in environment variables.")
+        return None
+
+    try:
+        client = create_client(url, key)
+        logger.info("Supabase client initialized successfully.")
+        return client
+    except Exception as e:
+        logger.error(f"Failed to initialize Supabase client: {e}")
+        return None
+
+
+def main() -> None:
+    """Main entry point for the NUSA Compute Heartbeat Gateway."""
+
+    logger.info("Initializing NUSA Compute Heartbeat Gateway...")
+
+    client = init_supabase()
+    if not client:
+        logger.error("Failed to initialize Supabase client. Exiting.")
+        sys.exit(1)
+
+    flusher = threading.Thread(target=run_flush_loop, args=(client,), daemon=True)
+    flusher.start()
+
+    port = int(os.getenv("GATEWAY_PORT", DEFAULT_PORT))
+    server = ThreadingHTTPServer(("0.0.0.0", port), HeartbeatHandler)
+
+    logger.info(f"Listening on port {port}; flushing every {FLUSH_INTERVAL}s.")
+    logger.info("Press Ctrl+C to stop the gateway.\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutdown requested (Ctrl+C)...")
+        server.shutdown()
+        logger.info("NUSA Compute Heartbeat Gateway stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,32 +8,47 @@ This script monitors local GPU resources and sends periodic heartbeats to a Supa
 
 import os
 import sys
+import json
 import uuid
 import time
+import atexit
+import random
+import signal
+import asyncio
+import queue
+import threading
+import hashlib
 import logging
-from datetime import datetime, timezone
+import functools
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-# Third-party imports
-try:
-    import GPUtil
-    from dotenv import load_dotenv
-    from supabase import create_client, Client
-except ImportError as e:
-    print(f"[ERROR] Missing dependency: {e}")
-    print("Please run: pip install -r requirements.txt")
-    sys.exit(1)
+# Third-party imports are deferred to the functions that need them:
+# supabase alone drags in httpx, postgrest, gotrue, storage3 and realtime,
+# which dominates cold-start time and resident memory before main() runs
+if TYPE_CHECKING:
+    import httpx
+    from supabase import Client
 
 
 # =============================================================================
 # Configuration
 # =============================================================================
 
-HEARTBEAT_INTERVAL = 60  # seconds
+LOAD_SAMPLE_INTERVAL = 15  # seconds; how often the loop considers sending
+GPU_SAMPLE_PERIOD = 5  # seconds between NVML reads by the sampler thread
+LOAD_DELTA_THRESHOLD = 5  # percent; load change that triggers an immediate heartbeat
+MAX_HEARTBEAT_INTERVAL = 300  # seconds; keepalive ceiling between heartbeats
 MAX_RETRIES = 3
-RETRY_DELAYS = [1, 2, 4]  # Exponential backoff delays in seconds
+RETRY_BASE_DELAY = 1  # seconds; doubled per attempt before jitter
+RETRY_MAX_DELAY = 30  # seconds; cap on any single backoff delay
+RETRY_BUDGET = 30  # seconds; total wall-clock allowance for retries
 NODE_ID_FILE = ".nusa_id"
 TABLE_NAME = "nodes"
+CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive failures before the circuit opens
+CIRCUIT_RECOVERY_TIMEOUT = 300  # seconds before an open circuit allows a probe
+SUPABASE_TIMEOUT = 10  # seconds; per-request timeout for Supabase HTTP calls
+GATEWAY_URL_ENV = "HEARTBEAT_GATEWAY_URL"  # optional batching gateway (see heartbeat_gateway.py)
 
 
 # =============================================================================
@@ -67,16 +82,43 @@ logger = setup_logging()
 
 def get_mac_address() -> str:
     """Get the MAC address of the machine as a hex string."""
-    mac = uuid.getnode()
-    return ':'.join(('%012x' % mac)[i:i+2] for i in range(0, 12, 2))
+    # bytes.hex(':') does the pairwise formatting in C, without the
+    # generator + substring + join dance
+    return bytes.fromhex(f"{uuid.getnode():012x}").hex(":")
 
 
+def _machine_raw_id() -> bytes | None:
+    """
+    Read the OS's stable machine identifier.
+
+    Returns:
+        Raw identifier bytes, or None if the platform doesn't expose one.
+    """
+    if os.name == "nt":
+        try:
+            import winreg
+            key_path = r"SOFTWARE\Microsoft\Cryptography"
+            with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, key_path) as key:
+                return winreg.QueryValueEx(key, "MachineGuid")[0].encode()
+        except OSError:
+            return None
+
+    try:
+        return Path("/etc/machine-id").read_bytes()
+    except OSError:
+        return None
+
+
+@functools.lru_cache(maxsize=1)
 def get_or_create_node_id() -> str:
     """
     Get or create a unique node ID for this machine.
-    
+
     The ID is persisted to .nusa_id file to remain consistent across restarts.
-    It's generated using the MAC address combined with a random UUID for uniqueness.
+    It's derived from the OS machine identifier (/etc/machine-id on Linux,
+    MachineGuid on Windows) hashed once with BLAKE2b, falling back to the
+    MAC address where no machine ID exists.
+    The result is memoized, so only the first call touches the disk.
     """
     script_dir = Path(__file__).parent
     id_file = script_dir / NODE_ID_FILE
@@ -91,14 +133,18 @@ def get_or_create_node_id() -> str:
         except Exception as e:
             logger.warning(f"Could not read {NODE_ID_FILE}: {e}")
     
-    # Generate new ID using MAC address as namespace
-    mac = get_mac_address()
-    namespace = uuid.UUID(int=uuid.getnode())
-    node_id = str(uuid.uuid5(namespace, f"{mac}-{uuid.uuid4()}"))
+    # Derive the ID from the machine identifier; one BLAKE2b pass replaces
+    # the old double uuid.getnode() + UUIDv5 (SHA-1) dance
+    raw = _machine_raw_id() or get_mac_address().encode()
+    node_id = str(uuid.UUID(bytes=hashlib.blake2b(raw, digest_size=16).digest()))
     
-    # Persist the ID
+    # Persist the ID, readable by the owner only
     try:
-        id_file.write_text(node_id)
+        fd = os.open(id_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.write(fd, node_id.encode())
+        finally:
+            os.close(fd)
         logger.info(f"Generated new node ID: {node_id[:8]}...")
     except Exception as e:
         logger.warning(f"Could not persist node ID: {e}")
@@ -112,73 +158,245 @@ def get_or_create_node_id() -> str:
 
 class GPUInfo:
     """Container for GPU metadata."""
-    def __init__(self, name: str, vram_total: int, driver_version: str, load: float):
+    def __init__(self, name: str, vram_total: int, driver_version: str, load: int):
         self.name = name
         self.vram_total = vram_total  # in MB
         self.driver_version = driver_version
-        self.load = load  # percentage (0-100)
-    
+        self.load = load  # integer percentage (0-100)
+
     def __repr__(self) -> str:
-        return f"GPU({self.name}, {self.vram_total}MB, Load: {self.load:.1f}%)"
+        return f"GPU({self.name}, {self.vram_total}MB, Load: {self.load}%)"
+
+
+# Cached NVML device handles, initialized on first use
+_nvml_handles: list | None = None
+
+
+def _decode(value) -> str:
+    """NVML returns bytes on some driver versions; normalize to str."""
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _visible_gpu_indices(count: int) -> list[int]:
+    """
+    Determine which GPU indices to report on.
+
+    Respects CUDA_VISIBLE_DEVICES so the client reports on the same
+    devices that workloads will actually use; defaults to all GPUs.
+    An explicitly empty value hides every GPU, mirroring CUDA.
+    """
+    visible = os.getenv("CUDA_VISIBLE_DEVICES")
+    if visible is None:
+        return list(range(count))
+
+    value = visible.strip()
+    if not value:
+        # CUDA_VISIBLE_DEVICES="" is the standard way to hide all GPUs
+        return []
+
+    parts = [part.strip() for part in value.split(",")]
+    if not all(part.isdigit() for part in parts):
+        # UUID-style entries (GPU-.../MIG-...) can't be mapped to NVML
+        # indices here; report all GPUs rather than guess, and say so
+        logger.warning(
+            f"Cannot map CUDA_VISIBLE_DEVICES={visible!r} to device "
+            "indices; reporting all GPUs."
+        )
+        return list(range(count))
+
+    return [i for i in map(int, parts) if i < count]
+
+
+def _get_nvml_handles() -> list:
+    """
+    Initialize NVML once and cache one handle per visible device.
+
+    The count is queried a single time at startup; after that, iterating
+    N GPUs costs N cheap library calls per tick instead of re-enumerating
+    the driver (or the process fork GPUtil's nvidia-smi polling incurred).
+    """
+    global _nvml_handles
+
+    if _nvml_handles is None:
+        import pynvml
+
+        pynvml.nvmlInit()
+        atexit.register(pynvml.nvmlShutdown)
+        count = pynvml.nvmlDeviceGetCount()
+        _nvml_handles = [
+            pynvml.nvmlDeviceGetHandleByIndex(i)
+            for i in _visible_gpu_indices(count)
+        ]
+
+    return _nvml_handles
+
+
+def _mean_load(handles: list) -> int:
+    """Average utilization across the given device handles, as int percent."""
+    import pynvml
+
+    loads = [pynvml.nvmlDeviceGetUtilizationRates(h).gpu for h in handles]
+    return round(sum(loads) / len(loads))
 
 
 def detect_gpu() -> GPUInfo | None:
     """
     Detect NVIDIA GPU and return its metadata.
-    
+
     Returns:
         GPUInfo object if GPU found, None otherwise.
     """
     try:
-        gpus = GPUtil.getGPUs()
-        
-        if not gpus:
+        import pynvml
+
+        handles = _get_nvml_handles()
+        if not handles:
             return None
-        
-        # Use the first GPU (primary)
-        gpu = gpus[0]
-        
+
+        # Name from the primary device, tagged with the count on
+        # multi-GPU nodes; VRAM summed and load averaged across devices
+        name = _decode(pynvml.nvmlDeviceGetName(handles[0]))
+        if len(handles) > 1:
+            name = f"{name} x{len(handles)}"
+
+        vram_total = sum(
+            int(pynvml.nvmlDeviceGetMemoryInfo(h).total // (1024 ** 2))  # MB
+            for h in handles
+        )
+
         return GPUInfo(
-            name=gpu.name,
-            vram_total=int(gpu.memoryTotal),  # MB
-            driver_version=gpu.driver,
-            load=gpu.load * 100  # Convert to percentage
+            name=name,
+            vram_total=vram_total,
+            driver_version=_decode(pynvml.nvmlSystemGetDriverVersion()),
+            load=_mean_load(handles)
         )
-    
+
+    except ImportError as e:
+        logger.error(f"Missing dependency: {e}")
+        logger.error("Please run: pip install -r requirements.txt")
+        return None
     except Exception as e:
         logger.error(f"GPU detection failed: {e}")
         return None
 
 
-def get_current_gpu_load() -> float:
+def get_current_gpu_load() -> int:
     """
     Get the current GPU load percentage.
-    
+
     Returns:
-        GPU load as percentage (0-100), or 0.0 if detection fails.
+        Mean GPU load across visible devices as integer percentage
+        (0-100), or 0 if detection fails.
     """
     try:
-        gpus = GPUtil.getGPUs()
-        if gpus:
-            return gpus[0].load * 100
+        handles = _get_nvml_handles()
+        if not handles:
+            return 0
+        return _mean_load(handles)
     except Exception:
-        pass
-    return 0.0
+        return 0
+
+
+class LoadSampler:
+    """
+    Background GPU load sampler.
+
+    A daemon thread reads NVML every GPU_SAMPLE_PERIOD seconds into a
+    one-slot latest-wins queue, acting as a bulkhead between GPU reads
+    and network writes: a stalled upsert never delays sampling, and the
+    heartbeat loop always gets the freshest reading available. The
+    bounded queue keeps memory flat if the consumer is stuck.
+    """
+
+    def __init__(self, period: float = GPU_SAMPLE_PERIOD):
+        self._period = period
+        self._latest: queue.Queue = queue.Queue(maxsize=1)
+        self._last = 0  # last reading handed to the consumer
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="gpu-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            load = get_current_gpu_load()
+
+            # Latest wins: drop any unconsumed reading before replacing it
+            try:
+                self._latest.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._latest.put_nowait(load)
+            except queue.Full:
+                pass
+
+            self._stop.wait(self._period)
+
+    def latest(self, timeout: float) -> int:
+        """
+        Get the most recent load reading, waiting up to timeout for one.
+
+        Falls back to the last consumed reading if the sampler produced
+        nothing in time (e.g. NVML briefly stalled).
+        """
+        try:
+            self._last = self._latest.get(timeout=timeout)
+        except queue.Empty:
+            pass
+        return self._last
 
 
 # =============================================================================
 # Supabase Client
 # =============================================================================
 
-def init_supabase() -> Client | None:
+def _load_env(filename: str = ".env") -> None:
+    """
+    Load KEY=VALUE pairs from a .env file into os.environ.
+
+    A minimal replacement for python-dotenv: the client only needs two
+    flat keys, so the package's globbing, interpolation and reload
+    machinery (plus its import cost) buys nothing here. Variables
+    already present in the environment are left untouched.
+    """
+    env_file = Path(__file__).parent / filename
+    try:
+        lines = env_file.read_text().splitlines()
+    except OSError:
+        return
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        key, value = line.split("=", 1)
+        os.environ.setdefault(key.strip(), value.strip().strip("'\""))
+
+
+def init_supabase() -> "Client | None":
     """
     Initialize the Supabase client using environment variables.
-    
+
     Returns:
         Supabase client instance, or None if initialization fails.
     """
+    try:
+        from supabase import create_client
+        from supabase.client import ClientOptions
+    except ImportError as e:
+        logger.error(f"Missing dependency: {e}")
+        logger.error("Please run: pip install -r requirements.txt")
+        return None
+
     # Load environment variables from .env file
-    load_dotenv()
+    _load_env()
     
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_KEY")
@@ -193,7 +411,14 @@ def init_supabase() -> Client | None:
         return None
     
     try:
-        client = create_client(url, key)
+        # Bound every request so a hung connection can't stall the
+        # heartbeat loop, and reuse the pooled keep-alive connection
+        # instead of opening a new one per upsert
+        client = create_client(url, key, options=ClientOptions(
+            postgrest_client_timeout=SUPABASE_TIMEOUT,
+            storage_client_timeout=SUPABASE_TIMEOUT,
+            httpx_client=get_http_client(),
+        ))
         logger.info("Supabase client initialized successfully.")
         return client
     except Exception as e:
@@ -201,120 +426,406 @@ def init_supabase() -> Client | None:
         return None
 
 
+# =============================================================================
+# Circuit Breaker
+# =============================================================================
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for calls to a degraded backend.
+
+    States:
+        CLOSED: calls pass through; consecutive failures are counted.
+        OPEN: calls are rejected immediately for the recovery timeout,
+              giving the backend room to recover.
+        HALF_OPEN: a single probe call is allowed; success closes the
+              circuit, failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        recovery_timeout: float = CIRCUIT_RECOVERY_TIMEOUT
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0.0
+
+    def call(self, func):
+        """
+        Invoke func through the breaker.
+
+        Raises:
+            CircuitOpenError: if the circuit is open and still cooling down.
+            Any exception raised by func itself (counted as a failure).
+        """
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                raise CircuitOpenError(
+                    f"Circuit '{self.name}' is open; skipping call."
+                )
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit '{self.name}' half-open; sending probe request.")
+
+        try:
+            result = func()
+        except Exception:
+            self._record_failure()
+            raise
+        else:
+            self._record_success()
+            return result
+
+    def _record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit '{self.name}' closed; backend recovered.")
+        self.state = self.CLOSED
+        self.failure_count = 0
+
+    def _record_failure(self) -> None:
+        self.failure_count += 1
+        if self.state == self.HALF_OPEN or self.failure_count >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(
+                    f"Circuit '{self.name}' opened after {self.failure_count} "
+                    f"consecutive failure(s); cooling down for {self.recovery_timeout}s."
+                )
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+# One breaker per table so future tables degrade independently
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(table_name: str) -> CircuitBreaker:
+    """Get or create the circuit breaker for a table."""
+    if table_name not in _breakers:
+        _breakers[table_name] = CircuitBreaker(table_name)
+    return _breakers[table_name]
+
+
 # =============================================================================
 # Heartbeat Logic
 # =============================================================================
 
+# SystemRandom decorrelates jitter across nodes even with identical start times
+_jitter = random.SystemRandom()
+
+TZ_SUFFIX = "+00:00"
+
+
+def iso_now() -> str:
+    """
+    Current UTC time as an ISO-8601 string.
+
+    Formats straight from time.time()/time.gmtime(), skipping the
+    datetime + tzinfo object allocations of
+    datetime.now(timezone.utc).isoformat() on the heartbeat hot path.
+    """
+    t = time.time()
+    return (
+        time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(t))
+        + f".{int(t % 1 * 1e6):06d}"
+        + TZ_SUFFIX
+    )
+
+# Single pooled HTTP client shared by Supabase and the optional gateway,
+# so every heartbeat reuses one kept-alive connection instead of paying
+# a fresh TCP + TLS handshake per tick
+_http_client: "httpx.Client | None" = None
+
+
+def get_http_client() -> "httpx.Client":
+    """Lazily create the shared keep-alive HTTP client."""
+    global _http_client
+    if _http_client is None:
+        import httpx
+
+        _http_client = httpx.Client(
+            timeout=SUPABASE_TIMEOUT,
+            limits=httpx.Limits(
+                max_keepalive_connections=4,
+                max_connections=8,
+                keepalive_expiry=120,
+            ),
+        )
+        atexit.register(_http_client.close)
+    return _http_client
+
+
+def _post_to_gateway(gateway_url: str, body: bytes) -> None:
+    """POST a pre-encoded heartbeat to the batching gateway."""
+    response = get_http_client().post(
+        gateway_url,
+        content=body,
+        headers={"Content-Type": "application/json"}
+    )
+    response.raise_for_status()
+
+
+def _retry_delay(attempt: int) -> float:
+    """
+    Compute a full-jittered exponential backoff delay for the given attempt.
+
+    Drawing uniformly from [0, min(cap, base * 2^attempt)] desynchronizes
+    retries across the fleet, avoiding retry storms against Supabase when
+    many nodes lose connectivity at the same time.
+    """
+    return _jitter.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+class HeartbeatPayload:
+    """
+    Heartbeat payload builder with the static fields frozen at startup.
+
+    node_id, gpu_name and vram_total never change while the client runs,
+    so they are both kept as a base dict and pre-serialized to a JSON
+    prefix once; per tick only the three dynamic fields are appended.
+    """
+
+    def __init__(self, node_id: str, gpu_info: GPUInfo):
+        self.base = {
+            "node_id": node_id,
+            "gpu_name": gpu_info.name,
+            "vram_total": gpu_info.vram_total,
+        }
+        # The static fields as JSON minus the closing brace, ready to
+        # have the dynamic fields appended without re-encoding
+        self._json_prefix = json.dumps(self.base, separators=(",", ":"))[:-1]
+
+    def as_dict(self, current_load: int, status: str, last_seen: str) -> dict:
+        """Full payload as a dict, for the Supabase client."""
+        return {
+            **self.base,
+            "current_load": current_load,
+            "status": status,
+            "last_seen": last_seen,
+        }
+
+    def as_json_bytes(self, current_load: int, status: str, last_seen: str) -> bytes:
+        """Full payload as encoded JSON, for the gateway POST body."""
+        return (
+            f'{self._json_prefix},"current_load":{current_load},'
+            f'"status":"{status}","last_seen":"{last_seen}"}}'
+        ).encode()
+
+
+def _heartbeat_breaker() -> CircuitBreaker:
+    """The circuit breaker guarding the active heartbeat backend."""
+    return get_circuit_breaker(
+        "gateway" if os.getenv(GATEWAY_URL_ENV) else TABLE_NAME
+    )
+
+
 def send_heartbeat(
-    client: Client,
-    node_id: str,
-    gpu_info: GPUInfo,
+    client: "Client",
+    payload: HeartbeatPayload,
+    current_load: int,
     status: str = "online"
-) -> bool:
+) -> str | None:
     """
     Send a heartbeat to the Supabase database with retry logic.
-    
+
     Args:
         client: Supabase client instance
-        node_id: Unique identifier for this node
-        gpu_info: GPU metadata object
+        payload: Payload builder holding the static node fields
+        current_load: Fresh GPU load reading as integer percent (0-100)
         status: Node status ('online' or 'offline')
-    
+
     Returns:
-        True if heartbeat was sent successfully, False otherwise.
+        The payload's last_seen ISO timestamp if the heartbeat was sent
+        successfully, None otherwise. Callers that need to tell a
+        deliberate circuit-open skip from a real failure can consult
+        _heartbeat_breaker().state.
     """
-    # Get fresh GPU load for each heartbeat
-    current_load = get_current_gpu_load()
-    
-    # Prepare the data payload
-    data = {
-        "node_id": node_id,
-        "gpu_name": gpu_info.name,
-        "vram_total": gpu_info.vram_total,
-        "current_load": round(current_load, 2),
-        "status": status,
-        "last_seen": datetime.now(timezone.utc).isoformat()
-    }
-    
-    # Retry logic with exponential backoff
+    last_seen = iso_now()
+
+    # When a gateway is configured, heartbeats are coalesced fleet-wide
+    # into bulk upserts instead of one Supabase write per node
+    gateway_url = os.getenv(GATEWAY_URL_ENV)
+
+    # Build the request body once, outside the retry loop: pre-encoded
+    # bytes for the gateway, a dict for the Supabase client
+    if gateway_url:
+        body = payload.as_json_bytes(current_load, status, last_seen)
+    else:
+        data = payload.as_dict(current_load, status, last_seen)
+
+    # Retry logic with full-jittered exponential backoff
+    breaker = _heartbeat_breaker()
+    deadline = time.monotonic() + RETRY_BUDGET
+
     for attempt in range(MAX_RETRIES):
         try:
-            # Upsert: Update if exists, insert if not
-            response = client.table(TABLE_NAME).upsert(
-                data,
-                on_conflict="node_id"
-            ).execute()
-            
-            return True
-            
+            if gateway_url:
+                breaker.call(lambda: _post_to_gateway(gateway_url, body))
+            else:
+                # Upsert: Update if exists, insert if not
+                response = breaker.call(
+                    lambda: client.table(TABLE_NAME).upsert(
+                        data,
+                        on_conflict="node_id"
+                    ).execute()
+                )
+
+            return last_seen
+
+        except CircuitOpenError:
+            # Backend is cooling down; skip the retry loop entirely
+            logger.debug("Heartbeat skipped: circuit is open.")
+            return None
+
         except Exception as e:
-            if attempt < MAX_RETRIES - 1:
-                delay = RETRY_DELAYS[attempt]
+            delay = _retry_delay(attempt)
+            if attempt < MAX_RETRIES - 1 and time.monotonic() + delay < deadline:
                 logger.warning(f"Heartbeat failed (attempt {attempt + 1}/{MAX_RETRIES}): {e}")
-                logger.warning(f"Retrying in {delay}s...")
+                logger.warning(f"Retrying in {delay:.1f}s...")
                 time.sleep(delay)
             else:
-                logger.error(f"Heartbeat failed after {MAX_RETRIES} attempts: {e}")
-                return False
-    
-    return False
+                logger.error(f"Heartbeat failed after {attempt + 1} attempt(s): {e}")
+                return None
 
+    return None
 
-def update_status_offline(client: Client, node_id: str) -> None:
+
+def update_status_offline(client: "Client", payload: HeartbeatPayload) -> None:
     """
     Update the node status to 'offline' in the database.
-    
-    Called during graceful shutdown.
+
+    Called during graceful shutdown. Routed through send_heartbeat so
+    that, when a gateway is configured, the offline row lands in the
+    same latest-wins buffer as any still-pending 'online' heartbeat.
+    Writing straight to Supabase here would race the gateway's next
+    flush, which could overwrite 'offline' with a stale 'online' row.
     """
-    try:
-        client.table(TABLE_NAME).update({
-            "status": "offline",
-            "last_seen": datetime.now(timezone.utc).isoformat()
-        }).eq("node_id", node_id).execute()
-        
+    if send_heartbeat(client, payload, 0, status="offline"):
         logger.info("Status updated to 'offline' in database.")
-    except Exception as e:
-        logger.error(f"Failed to update offline status: {e}")
+    else:
+        logger.error("Failed to update offline status.")
 
 
-def run_heartbeat_loop(client: Client, node_id: str, gpu_info: GPUInfo) -> None:
+def _install_signal_handlers(shutdown: asyncio.Event) -> None:
     """
-    Run the infinite heartbeat loop.
-    
-    Sends a heartbeat every HEARTBEAT_INTERVAL seconds.
-    Handles KeyboardInterrupt for graceful shutdown.
+    Wake the heartbeat loop immediately on SIGINT/SIGTERM.
+
+    A plain sleep would leave up to a full sample interval between a
+    systemd SIGTERM and the offline status update; setting the event
+    interrupts the wait right away.
+    """
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, shutdown.set)
+        except NotImplementedError:
+            # Windows has no loop-level signal handlers
+            signal.signal(sig, lambda *_: shutdown.set())
+
+
+async def run_heartbeat_loop(
+    client: "Client",
+    gpu_info: GPUInfo,
+    payload: HeartbeatPayload
+) -> None:
+    """
+    Run the heartbeat loop until shutdown is requested.
+
+    A LoadSampler thread keeps a fresh GPU reading available; every
+    LOAD_SAMPLE_INTERVAL seconds the loop takes the latest one and sends
+    a heartbeat only when the load moved by more than
+    LOAD_DELTA_THRESHOLD percent, with a MAX_HEARTBEAT_INTERVAL
+    keepalive so the node never looks dead while idle. The Supabase
+    upsert stays synchronous but runs in a worker thread, so the event
+    loop remains free for future concurrent duties (local scheduler
+    tasks, health endpoints, realtime callbacks).
     """
     logger.info("=" * 50)
     logger.info("NUSA Compute Provider Client Started")
     logger.info("=" * 50)
-    logger.info(f"Node ID: {node_id[:8]}...")
+    logger.info(f"Node ID: {payload.base['node_id'][:8]}...")
     logger.info(f"GPU: {gpu_info.name}")
     logger.info(f"VRAM: {gpu_info.vram_total} MB")
     logger.info(f"Driver: {gpu_info.driver_version}")
-    logger.info(f"Heartbeat Interval: {HEARTBEAT_INTERVAL}s")
+    logger.info(f"Load Sample Interval: {LOAD_SAMPLE_INTERVAL}s")
+    logger.info(f"Keepalive Interval: {MAX_HEARTBEAT_INTERVAL}s")
     logger.info("=" * 50)
     logger.info("Press Ctrl+C to stop the client.\n")
-    
-    try:
-        while True:
-            # Send heartbeat
-            success = send_heartbeat(client, node_id, gpu_info, status="online")
-            
-            if success:
-                current_time = datetime.now().strftime("%H:%M")
-                logger.info(f"Heartbeat sent at {current_time} - Status: Online")
+
+    shutdown = asyncio.Event()
+    _install_signal_handlers(shutdown)
+
+    # GPU reads happen on their own thread so a slow upsert can't delay
+    # sampling (and vice versa)
+    sampler = LoadSampler()
+    sampler.start()
+
+    last_sent_load: int | None = None
+    last_sent_at = 0.0  # time.monotonic() of the last successful send
+    next_tick = time.monotonic()  # drift-corrected schedule target
+
+    while not shutdown.is_set():
+        # Take the freshest reading from the sampler thread
+        current_load = await asyncio.to_thread(sampler.latest, GPU_SAMPLE_PERIOD * 2)
+        now = time.monotonic()
+
+        # Idle nodes report the same load over and over; only write when
+        # the load actually moved, with a periodic keepalive
+        should_send = (
+            last_sent_load is None
+            or abs(current_load - last_sent_load) > LOAD_DELTA_THRESHOLD
+            or now - last_sent_at > MAX_HEARTBEAT_INTERVAL
+        )
+
+        if should_send:
+            sent_at = await asyncio.to_thread(
+                send_heartbeat, client, payload, current_load, "online"
+            )
+
+            if sent_at:
+                last_sent_load = current_load
+                last_sent_at = now
+                # Slice HH:MM out of the last_seen timestamp instead of
+                # formatting a second datetime for the log line
+                logger.info(f"Heartbeat sent at {sent_at[11:16]} UTC - Status: Online")
+            elif _heartbeat_breaker().state == CircuitBreaker.OPEN:
+                # Deliberate skip while the backend cools down;
+                # send_heartbeat already logged it at DEBUG
+                pass
             else:
                 logger.warning("Heartbeat failed - will retry next interval")
-            
-            # Wait for next heartbeat
-            time.sleep(HEARTBEAT_INTERVAL)
-            
-    except KeyboardInterrupt:
-        logger.info("\n")
-        logger.info("Shutdown requested (Ctrl+C)...")
-        update_status_offline(client, node_id)
-        logger.info("NUSA Compute Provider Client stopped.")
-        sys.exit(0)
+        else:
+            logger.debug(f"Load stable at {current_load}%; heartbeat skipped.")
+
+        # Sleep toward a fixed monotonic target rather than a fixed
+        # duration, so upsert latency doesn't stretch the effective
+        # period; waking immediately on shutdown
+        next_tick += LOAD_SAMPLE_INTERVAL
+        sleep_for = next_tick - time.monotonic()
+
+        if sleep_for <= 0:
+            # The tick overran a full interval; rebase instead of
+            # firing catch-up samples back to back
+            next_tick = time.monotonic()
+            continue
+
+        try:
+            await asyncio.wait_for(shutdown.wait(), timeout=sleep_for)
+        except asyncio.TimeoutError:
+            pass
+
+    sampler.stop()
 
 
 # =============================================================================
@@ -353,8 +864,23 @@ def main() -> None:
         logger.error("Failed to initialize Supabase client. Exiting.")
         sys.exit(1)
     
-    # Step 4: Start heartbeat loop
-    run_heartbeat_loop(client, node_id, gpu_info)
+    # Static fields are built (and pre-serialized) once; shared by the
+    # loop and the shutdown path
+    payload = HeartbeatPayload(node_id, gpu_info)
+
+    # Step 4: Start heartbeat loop; returns once SIGINT/SIGTERM is received
+    try:
+        asyncio.run(run_heartbeat_loop(client, gpu_info, payload))
+    except KeyboardInterrupt:
+        # Windows fallback path where Ctrl+C raises instead of setting
+        # the shutdown event
+        pass
+
+    logger.info("\n")
+    logger.info("Shutdown requested...")
+    update_status_offline(client, payload)
+    logger.info("NUSA Compute Provider Client stopped.")
+    sys.exit(0)
 
 
 if __name__ == "__main__":